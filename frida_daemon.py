@@ -0,0 +1,61 @@
+"""
+Author: ronaldon2023@gmail.com
+"""
+
+#!/usr/bin/env python3
+"""
+Frida Harness Daemon
+Keeps one Frida device connection, session and agent alive and serves fuzz
+inputs over a Unix socket, so the AFL++-facing harness only ships bytes
+"""
+
+import os
+import socket
+import sys
+
+from frida_webview_fuzzer import ADB_BIN, FridaWebViewFuzzer
+from harness_client import DAEMON_SOCKET, STATUS_CRASH, STATUS_OK, read_frame
+
+def serve(fuzzer, sock):
+    """Answer each framed input with one status byte"""
+    while True:
+        conn, _ = sock.accept()
+        with conn, conn.makefile("rb") as stream:
+            try:
+                for input_data in iter(lambda: read_frame(stream), None):
+                    result = fuzzer.test_with_frida(input_data, exit_on_crash=False)
+                    conn.sendall(STATUS_CRASH if result.get('frida_crash_detected') else STATUS_OK)
+            except OSError as e:
+                print(f" Client connection dropped: {e}", file=sys.stderr)
+
+def main():
+    if not ADB_BIN:
+        print(" ADB not found, exiting.", file=sys.stderr)
+        sys.exit(1)
+
+    fuzzer = FridaWebViewFuzzer()
+
+    try:
+        if not fuzzer.setup():
+            sys.exit(1)
+
+        # Remove a stale socket left behind by a previous daemon
+        if os.path.exists(DAEMON_SOCKET):
+            os.unlink(DAEMON_SOCKET)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(DAEMON_SOCKET)
+            try:
+                sock.listen(1)
+                print(f" Frida daemon listening on {DAEMON_SOCKET}", file=sys.stderr)
+                serve(fuzzer, sock)
+            finally:
+                os.unlink(DAEMON_SOCKET)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fuzzer.cleanup()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,20 @@
 
 console.log("[Frida] Script loading started...");
 
+// Fuzz inputs arrive as raw bytes (ArrayBuffer). Map each byte to one
+// char (ISO-8859-1) so no mutation is lost to UTF-8 decoding.
+function bytesToString(data) {
+  if (!(data instanceof ArrayBuffer)) {
+    return data;
+  }
+  var bytes = new Uint8Array(data);
+  var chunks = [];
+  for (var i = 0; i < bytes.length; i += 0x8000) {
+    chunks.push(String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000)));
+  }
+  return chunks.join('');
+}
+
 // Simple exports that work immediately without Java
 // Using lowercase names to match Frida's automatic conversion
 var rpc_exports = {
@@ -16,9 +30,16 @@ var rpc_exports = {
     return "com.ss.android.ugc.aweme.splash.SplashActivity";
   },
 
-  callwebviewloadurl: function(url) {
+  callwebviewloadurl: function(data) {
+    var url = bytesToString(data);
     console.log("[Frida] callwebviewloadurl called with: " + url);
     return true;
+  },
+
+  // Combined clear + load so each fuzz input costs a single RPC
+  clearandloadurl: function(data) {
+    rpc_exports.clearvulnerabilities();
+    return rpc_exports.callwebviewloadurl(data);
   }
 };
 
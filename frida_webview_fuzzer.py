@@ -0,0 +1,439 @@
+"""
+Author: ronaldon2023@gmail.com
+"""
+
+"""
+Frida WebView Fuzzer
+Device, session and agent management shared by targeted_webview_harness.py
+and frida_daemon.py
+"""
+
+import sys
+import subprocess
+import time
+import hashlib
+import os
+import selectors
+import shutil
+import frida
+
+from harness_client import LOG
+
+# Target app information
+TARGET_PACKAGE = "com.ss.android.ugc.trill"
+TARGET_ACTIVITY = "com.ss.android.ugc.aweme.main.MainActivity"
+
+def find_adb():
+    """Locate the adb binary, preferring PATH over the macOS Android SDK default"""
+    adb = shutil.which("adb")
+    if adb:
+        return adb
+    
+    sdk_adb = os.path.join(os.path.expanduser("~/Library/Android/sdk/platform-tools"), "adb")
+    if os.path.exists(sdk_adb):
+        return sdk_adb
+    
+    print(f"adb not found on PATH or at: {sdk_adb}", file=sys.stderr)
+    return None
+
+# Resolve the adb executable once at import time
+ADB_BIN = find_adb()
+
+def crash_exit(msg):
+    """Report a crash and exit immediately, skipping interpreter shutdown and
+    the Frida unload/detach RPCs that can hang on a dying agent"""
+    sys.stderr.write(msg + "\n")
+    sys.stderr.flush()
+    os._exit(1)
+
+# Also accept these activities as valid (BRAVOSECAI has multiple entry points)
+VALID_BRAVOSECAI_ACTIVITIES = frozenset({
+    "com.ss.android.ugc.aweme.main.MainActivity",
+    "com.bravodance.pumbaa.offline.base.dialog.PumbaaOfflineDialog",
+    "com.ss.android.ugc.aweme.main.MainActivityAlias",
+    "com.ss.android.ugc.aweme.splash.SplashActivity"
+})
+
+# Frida agent source and compiled bytecode, cached across re-attaches
+_FRIDA_SCRIPT_SRC = None
+_FRIDA_SCRIPT_BYTES = None
+# Cleared once compiling fails or the agent rejects the bytecode, after
+# which this process loads the agent from source
+_FRIDA_PRECOMPILE = True
+
+def _read_frida_script():
+    """Read frida_hooks.js into the module-level cache"""
+    global _FRIDA_SCRIPT_SRC
+    if _FRIDA_SCRIPT_SRC is None:
+        with open("frida_hooks.js", "r") as f:
+            _FRIDA_SCRIPT_SRC = f.read()
+
+class FridaWebViewFuzzer:
+    def __init__(self):
+        self.device = None
+        self.session = None
+        self.script = None
+        self._clear_and_load = None
+        self._detached = True
+        self._spawned_pid = None
+        self._adb = None
+        
+        # Keep one adb shell open for device probes instead of forking a new
+        # adb client (and reconnecting to adbd) for every command
+        try:
+            self._adb = subprocess.Popen([ADB_BIN, 'shell'], stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         bufsize=0)
+        except OSError as e:
+            print(f"Failed to start persistent adb shell: {e}", file=sys.stderr)
+
+    def _adb_cmd(self, cmd, timeout=2):
+        """Run a command in the persistent adb shell and return its stdout"""
+        if not self._adb or self._adb.poll() is not None:
+            return self._adb_cmd_oneshot(cmd, timeout)
+        
+        try:
+            self._adb.stdin.write(f"{cmd}; echo __END_$?__\n".encode())
+            fd = self._adb.stdout.fileno()
+            output = b''
+            deadline = time.monotonic() + timeout
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_READ)
+                while True:
+                    # The sentinel may share a line with output lacking a trailing
+                    # newline; wait for its own newline so nothing leaks into the
+                    # next command's output
+                    end = output.find(b'__END_')
+                    if end != -1 and output.find(b'\n', end) != -1:
+                        return output[:end]
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not selector.select(remaining):
+                        break
+                    chunk = os.read(fd, 4096)
+                    if not chunk:
+                        break
+                    output += chunk
+        except OSError:
+            pass
+        
+        # The shell is stuck (device unplugged, adbd stalled) or gone
+        print("Persistent adb shell unresponsive, falling back to one-off adb calls", file=sys.stderr)
+        self._adb.kill()
+        self._adb.wait()
+        self._adb = None
+        return self._adb_cmd_oneshot(cmd, timeout)
+
+    def _adb_cmd_oneshot(self, cmd, timeout):
+        """Run a command through a fresh adb client and return its stdout"""
+        try:
+            return subprocess.check_output([ADB_BIN, 'shell', cmd],
+                                           stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.CalledProcessError as e:
+            return e.output
+        except (OSError, subprocess.TimeoutExpired):
+            return b''
+        
+    def check_current_activity_frida(self):
+        """Check current activity using Frida"""
+        try:
+            if not self.session or not self.script:
+                return None
+
+            # Use the correct, synchronous exports property
+            # And the correct method name
+            activity_name = self.script.exports_sync.getcurrentactivity()
+            return activity_name
+        except Exception as e:
+            print(f"Failed to check current activity via Frida: {e}", file=sys.stderr)
+            return None
+
+    def wait_for_main_activity(self, timeout=30):
+        """Waits for the main activity to be loaded and ready for fuzzing."""
+        print("Waiting for main activity to load...", file=sys.stderr)
+        try:
+            get_current_activity = self.script.exports_sync.getcurrentactivity
+            valid_activities = VALID_BRAVOSECAI_ACTIVITIES
+            delay = 0.1
+            start_time = time.time()
+            while time.time() - start_time < timeout:
+                current_activity = get_current_activity()
+                if current_activity in valid_activities:
+                    print("Target activity is loaded.", file=sys.stderr)
+                    return True
+                
+                # Only log once the backoff has reached its cap
+                if delay >= 1.0:
+                    LOG(f"Current activity: {current_activity or 'unknown'}, waiting...\n")
+                time.sleep(delay)
+                delay = min(delay * 1.7, 1.0)
+            print("Timeout waiting for main activity to be ready.", file=sys.stderr)
+            return False
+        except Exception as e:
+            print(f"Failed to wait for main activity: {e}", file=sys.stderr)
+            return False
+
+    def connect_to_device(self):
+        # A single enumeration pass, preferring USB over remote devices
+        devices = frida.get_device_manager().enumerate_devices()
+        self.device = next((d for d in devices if d.type == 'usb'), None) \
+            or next((d for d in devices if d.type == 'remote'), None)
+        
+        if self.device is None:
+            print("No USB or remote device available", file=sys.stderr)
+            return False
+        
+        print(f"Connected to {self.device.type} device: {self.device.name}", file=sys.stderr)
+        return True
+
+    def attach_to_app(self):
+        """Attach Frida to the target app"""
+        try:
+            # First try to find the process by checking if it's running
+            pid_str = self._adb_cmd(f"pidof -s {TARGET_PACKAGE}").strip()
+            
+            if not pid_str:
+                # Older devices may lack pidof, fall back to an exact-name pgrep
+                # so child processes like "<package>:push" are not matched
+                pid_str = self._adb_cmd(f"pgrep -x {TARGET_PACKAGE}").split(b'\n', 1)[0].strip()
+            
+            if pid_str:
+                # Process is running, try to attach by PID
+                try:
+                    pid = int(pid_str)
+                    print(f"Found running process: {TARGET_PACKAGE} (PID: {pid})", file=sys.stderr)
+                    self._attach(pid)
+                    print(f"Attached to app process", file=sys.stderr)
+                    return True
+                except Exception as e:
+                    print(f"Failed to attach to existing process: {e}", file=sys.stderr)
+            
+            # If we get here, spawn a new process
+            print(f"App {TARGET_PACKAGE} not running, attempting to spawn", file=sys.stderr)
+            pid = self.device.spawn([TARGET_PACKAGE])
+            # Leave the app suspended until load_frida_script has installed the hooks
+            self._spawned_pid = pid
+            self._attach(pid)
+            
+            print(f" Attached to app process", file=sys.stderr)
+            return True
+            
+        except Exception as e:
+            print(f" Failed to attach to app: {e}", file=sys.stderr)
+            self._kill_spawned()
+            return False 
+
+    def _kill_spawned(self):
+        """Kill an app we spawned but never resumed, so no suspended process
+        is left behind for the next run's pidof lookup to attach to"""
+        if self._spawned_pid is None:
+            return
+        try:
+            self.device.kill(self._spawned_pid)
+        except Exception as e:
+            print(f" Failed to kill suspended app (PID: {self._spawned_pid}): {e}", file=sys.stderr)
+        self._spawned_pid = None
+
+    def _attach(self, pid):
+        """Attach to pid and track detaches via Frida's detached signal"""
+        self.session = self.device.attach(pid)
+        self._detached = False
+        self.session.on('detached', self._on_detached)
+
+    def _on_detached(self, reason, crash=None):
+        self._detached = True
+
+    def _bytecode_cache_path(self, source):
+        """On-disk bytecode cache for source, keyed by the host Frida version
+        and the device, since the device's agent produces the bytecode"""
+        key = f"{frida.__version__}\0{self.device.id}\0{source}"
+        return f".frida_hooks.{hashlib.sha256(key.encode()).hexdigest()[:16]}.qjs"
+
+    def _compile_frida_script(self, source):
+        """Compile the agent to QuickJS bytecode, reusing an on-disk copy so
+        new processes skip the compile"""
+        cache_path = self._bytecode_cache_path(source)
+        try:
+            with open(cache_path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        
+        bytecode = self.session.compile_script(source, runtime="qjs")
+        # Write atomically so parallel instances never read a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(bytecode)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f" Could not cache compiled Frida script: {e}", file=sys.stderr)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return bytecode
+
+    def _discard_compiled_script(self):
+        """Drop bytecode the agent rejected, in memory and on disk"""
+        global _FRIDA_SCRIPT_BYTES, _FRIDA_PRECOMPILE
+        _FRIDA_SCRIPT_BYTES = None
+        _FRIDA_PRECOMPILE = False
+        try:
+            os.unlink(self._bytecode_cache_path(_FRIDA_SCRIPT_SRC))
+        except OSError:
+            pass
+
+    def _create_script(self, bytecode=None):
+        if bytecode is not None:
+            script = self.session.create_script_from_bytes(bytecode, runtime="qjs")
+        else:
+            script = self.session.create_script(_FRIDA_SCRIPT_SRC, runtime="qjs")
+        script.on('message', self.on_frida_message)
+        # The agent's console.log calls fire on every input
+        script.set_log_handler(lambda level, text: LOG(f"[Frida] {text}\n"))
+        try:
+            script.load()
+        except Exception:
+            try:
+                script.unload()
+            except Exception:
+                pass
+            raise
+        return script
+
+    def load_frida_script(self):
+        global _FRIDA_SCRIPT_BYTES, _FRIDA_PRECOMPILE
+        try:
+            _read_frida_script()
+        except FileNotFoundError:
+            print(" Frida hooks script not found", file=sys.stderr)
+            return False
+            
+        try:
+            # Compile once when supported so re-attaches skip the JS parse
+            if _FRIDA_PRECOMPILE and _FRIDA_SCRIPT_BYTES is None:
+                try:
+                    _FRIDA_SCRIPT_BYTES = self._compile_frida_script(_FRIDA_SCRIPT_SRC)
+                except Exception as e:
+                    print(f" Frida script precompile unavailable, using source: {e}", file=sys.stderr)
+                    # A dead session says nothing about compile support
+                    if not self._detached:
+                        _FRIDA_PRECOMPILE = False
+            
+            script = None
+            if _FRIDA_SCRIPT_BYTES is not None:
+                try:
+                    script = self._create_script(_FRIDA_SCRIPT_BYTES)
+                except Exception as e:
+                    # The session or app may have died during load, which says
+                    # nothing about the bytecode
+                    if self._detached:
+                        raise
+                    print(f" Compiled Frida script failed to load, trying source: {e}", file=sys.stderr)
+                    script = self._create_script()
+                    # Source loaded on the same live session, so the bytecode is bad;
+                    # a truncated or stale cache file must not break every later run
+                    self._discard_compiled_script()
+            if script is None:
+                script = self._create_script()
+            
+            self.script = script
+            # Bind the per-input RPC once; test_with_frida calls it for every input
+            self._clear_and_load = self.script.exports_sync.clearandloadurl
+            print(" Frida script loaded successfully", file=sys.stderr)
+            
+            if self._spawned_pid is not None:
+                self.device.resume(self._spawned_pid)
+                self._spawned_pid = None
+            return True
+        except Exception as e:
+            print(f" Failed to load Frida script: {e}", file=sys.stderr)
+            self._kill_spawned()
+            return False
+    
+    def on_frida_message(self, message, data):
+        if message['type'] == 'send':
+            LOG(f"[Frida] {message['payload']}\n")
+        elif message['type'] == 'error':
+            print(f"[Frida Error] {message['stack']}", file=sys.stderr)
+
+    def setup(self):
+        """Connect, attach, load the agent and wait until the app is ready"""
+        return (self.connect_to_device()
+                and self.attach_to_app()
+                and self.load_frida_script()
+                and self.wait_for_main_activity())
+
+    def _release_session(self):
+        """Drop the script and session of a detached app before re-attaching"""
+        try:
+            if self.script:
+                self.script.unload()
+        except Exception:
+            pass
+        try:
+            if self.session:
+                self.session.detach()
+        except Exception:
+            pass
+        self.script = None
+        self.session = None
+        self._clear_and_load = None
+
+    def _report_crash(self, msg, exit_on_crash):
+        if exit_on_crash:
+            crash_exit(msg)
+        print(msg, file=sys.stderr)
+        return { 'frida_crash_detected': True }
+
+    def test_with_frida(self, input_data, exit_on_crash=True):
+        try:
+            if self._detached:
+                LOG(" Frida session detached, attempting to re-attach...\n")
+                self._release_session()
+                
+                # A respawned app needs the same startup wait setup() gives it
+                if not (self.attach_to_app()
+                        and self.load_frida_script()
+                        and self.wait_for_main_activity()):
+                    # Leave the fuzzer detached so the next input retries the
+                    # re-attach instead of calling into a half-set-up session
+                    self._release_session()
+                    self._detached = True
+                    return self._report_crash("Failed to re-attach, propagating crash.", exit_on_crash)
+
+            # Clear and load in a single RPC round-trip
+            # Raw bytes are shipped as the RPC data payload, not JSON
+            self._clear_and_load(input_data)
+
+            app_is_attached = not self._detached
+            if not app_is_attached:
+                return self._report_crash("App crashed during WebView.loadUrl test, propagating crash.", exit_on_crash)
+
+            return { 'frida_crash_detected': not app_is_attached }
+            
+        except Exception as e:
+            return self._report_crash(f"TARGETED Frida test failed: {e}", exit_on_crash)
+    
+    def cleanup(self):
+        """Clean up Frida resources"""
+        self._kill_spawned()
+        try:
+            if self.script:
+                self.script.unload()
+            if self.session:
+                self.session.detach()
+            print(" Frida resources cleaned up", file=sys.stderr)
+        except Exception as e:
+            print(f" Cleanup warning: {e}", file=sys.stderr)
+        
+        # Close the adb shell even if the Frida teardown above failed
+        if self._adb:
+            try:
+                self._adb.stdin.close()
+                self._adb.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._adb.kill()
+                self._adb.wait()
+            except Exception as e:
+                print(f" Cleanup warning: {e}", file=sys.stderr)
+        sys.stderr.flush()
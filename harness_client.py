@@ -0,0 +1,57 @@
+"""
+Author: ronaldon2023@gmail.com
+"""
+
+"""
+Harness Client
+Framed input protocol and daemon client. Kept free of Frida and other heavy
+imports so a per-input harness process that hands off to frida_daemon.py
+starts as fast as possible
+"""
+
+import os
+import socket
+import struct
+import sys
+
+# Hot-path logging is a no-op unless HARNESS_VERBOSE is set
+LOG = sys.stderr.write if os.environ.get("HARNESS_VERBOSE") else (lambda *_: None)
+
+# Unix socket served by frida_daemon.py
+DAEMON_SOCKET = os.environ.get("HARNESS_DAEMON_SOCKET", "/tmp/frida_harness.sock")
+
+# Framed input protocol, shared by persistent mode (stdin/stdout) and
+# frida_daemon.py (Unix socket):
+#   request: little-endian uint32 payload length, then the payload bytes
+#   reply:   one status byte per input, STATUS_OK or STATUS_CRASH
+STATUS_OK = b"\x00"
+STATUS_CRASH = b"\x01"
+
+def read_frame(stream):
+    """Read one framed input. Returns None once the stream is exhausted."""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    (length,) = struct.unpack("<I", header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return payload
+
+def send_to_daemon(input_data):
+    """Hand one input to a running frida_daemon.py over its Unix socket.
+    Returns whether the app crashed, or None if no daemon is listening."""
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(DAEMON_SOCKET)
+    except OSError:
+        return None
+    
+    with sock:
+        try:
+            sock.sendall(struct.pack("<I", len(input_data)) + input_data)
+            reply = sock.recv(1)
+        except OSError:
+            reply = b""
+    # A daemon that went away mid-input is treated as a crash
+    return reply != STATUS_OK